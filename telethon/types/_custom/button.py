@@ -1,3 +1,4 @@
+import functools
 import typing
 
 from .messagebutton import MessageButton
@@ -5,6 +6,53 @@ from ... import _tl
 from ..._misc import utils, hints
 
 
+_INLINE_BUTTON_TYPES = (
+    _tl.KeyboardButtonBuy,
+    _tl.KeyboardButtonCallback,
+    _tl.KeyboardButtonGame,
+    _tl.KeyboardButtonSwitchInline,
+    _tl.KeyboardButtonUrl,
+    _tl.InputKeyboardButtonUrlAuth,
+    _tl.KeyboardButtonUserProfile,
+    _tl.InputKeyboardButtonUserProfile
+)
+
+_REPLY_MARKUP_ID = 0xe2e10ef2  # crc32(b'ReplyMarkup')
+_KEYBOARD_BUTTON_ID = 0xbad74a3  # crc32(b'KeyboardButton')
+
+# Every :tl:`KeyboardButton` constructor, derived from the generated layer
+# so it stays in sync with new button types.
+_VALID_KB_TYPES = frozenset(
+    cls for cls in _tl.tlobjects.values()
+    if cls.SUBCLASS_OF_ID == _KEYBOARD_BUTTON_ID
+)
+
+# Text-only buttons are commonly rebuilt with the same text for every
+# message (e.g. menus), so identical instances are reused. Sharing them
+# is safe because TL objects are frozen.
+_make_kb = functools.lru_cache(maxsize=256)(_tl.KeyboardButton)
+_make_buy = functools.lru_cache(maxsize=128)(_tl.KeyboardButtonBuy)
+_make_game = functools.lru_cache(maxsize=128)(_tl.KeyboardButtonGame)
+
+
+def _is_inline_button(button, _types=_INLINE_BUTTON_TYPES):
+    """
+    Returns `True` if the button belongs to an inline keyboard.
+    """
+    return isinstance(button, _types)
+
+
+def _input_user_or_self(entity):
+    """
+    Returns the :tl:`InputUser` for `entity`, or :tl:`InputUserSelf` if it's `None`.
+    """
+    if entity is None:
+        return _tl.InputUserSelf()
+    if isinstance(entity, (_tl.InputUserSelf, _tl.InputUser)):
+        return entity
+    return utils.get_input_user(entity)
+
+
 class Button:
     """
     .. note::
@@ -40,26 +88,21 @@ class Button:
     to 128 characters and add the ellipsis (…) character as
     the 129.
     """
+    __slots__ = ('button', 'resize', 'single_use', 'selective')
+
     def __init__(self, button, *, resize, single_use, selective):
         self.button = button
         self.resize = resize
         self.single_use = single_use
         self.selective = selective
 
-    @staticmethod
-    def _is_inline(button):
+    @classmethod
+    def _make(cls, ctor, text, resize, single_use, selective, **extra):
         """
-        Returns `True` if the button belongs to an inline keyboard.
+        Wraps a new keyboard button of type `ctor` with the given options.
         """
-        return isinstance(button, (
-            _tl.KeyboardButtonBuy,
-            _tl.KeyboardButtonCallback,
-            _tl.KeyboardButtonGame,
-            _tl.KeyboardButtonSwitchInline,
-            _tl.KeyboardButtonUrl,
-            _tl.InputKeyboardButtonUrlAuth,
-            _tl.InputKeyboardButtonUserProfile
-        ))
+        return cls(ctor(text, **extra),
+                   resize=resize, single_use=single_use, selective=selective)
 
     @staticmethod
     def inline(text, data=None):
@@ -80,9 +123,17 @@ class Button:
         button was pressed.
         """
         if not data:
-            data = text.encode('utf-8')
-        elif not isinstance(data, (bytes, bytearray, memoryview)):
-            data = str(data).encode('utf-8')
+            # ASCII text encodes to as many bytes as characters,
+            # so oversized text can be rejected before encoding.
+            if text.isascii() and len(text) > 64:
+                raise ValueError('Too many bytes for the data')
+            data = text.encode()
+        elif type(data) is bytes:
+            pass  # most common case, nothing to convert
+        elif isinstance(data, (bytes, bytearray, memoryview)):
+            data = bytes(data)
+        else:
+            data = str(data).encode()
 
         if len(data) > 64:
             raise ValueError('Too many bytes for the data')
@@ -121,7 +172,7 @@ class Button:
         the domain is trusted, and once confirmed the URL will open in their
         device.
         """
-        return _tl.KeyboardButtonUrl(text, url or text)
+        return _tl.KeyboardButtonUrl(text, text if url is None else url)
 
     @staticmethod
     def auth(text, url=None, *, bot=None, write_access=False, fwd_text=None):
@@ -163,8 +214,8 @@ class Button:
         """
         return _tl.InputKeyboardButtonUrlAuth(
             text=text,
-            url=url or text,
-            bot=utils.get_input_user(bot or _tl.InputUserSelf()),
+            url=text if url is None else url,
+            bot=_input_user_or_self(bot),
             request_write_access=write_access,
             fwd_text=fwd_text
         )
@@ -195,13 +246,11 @@ class Button:
 
         """
         return _tl.InputKeyboardButtonUserProfile(
-            text,
-            utils.get_input_user(input_entity or _tl.InputUserSelf())
-        )
+            text, _input_user_or_self(input_entity))
         
 
     @staticmethod
-    def mention(text, input_entity=None):
+    def mention(text, input_entity):
         """
         Creates a text mentioning the user.
 
@@ -215,8 +264,9 @@ class Button:
 
             input_entity:
                 Input entity of :tl:User to use for profile button.
-                By default, this is the logged in user (itself), although
-                you may pass a different input peer.
+                This button needs the user's ID, so it cannot refer to
+                the logged in user (itself). If it does, ``ValueError``
+                is raised.
 
                 .. note::
 
@@ -225,14 +275,11 @@ class Button:
                     `client.get_input_entity() <telethon.client.users.UserMethods.get_input_entity>`.
 
         """
-        return types.KeyboardButtonUserProfile(
-            text,
-            (
-                utils.get_input_user(
-                    input_entity or _tl.InputUserSelf()
-                ).id
-            )
-        )
+        input_entity = _input_user_or_self(input_entity)
+        if isinstance(input_entity, (_tl.InputUserSelf, _tl.InputUserEmpty)):
+            raise ValueError('A specific user is required to create a mention')
+
+        return _tl.KeyboardButtonUserProfile(text, input_entity.user_id)
 
 
     @classmethod
@@ -261,8 +308,7 @@ class Button:
         between a button press and the user typing and sending exactly the
         same text on their own.
         """
-        return cls(_tl.KeyboardButton(text),
-                   resize=resize, single_use=single_use, selective=selective)
+        return cls._make(_make_kb, text, resize, single_use, selective)
 
     @classmethod
     def request_location(cls, text, *,
@@ -276,8 +322,8 @@ class Button:
         to the user asking whether they want to share their location with the
         bot, and if confirmed a message with geo media will be sent.
         """
-        return cls(_tl.KeyboardButtonRequestGeoLocation(text),
-                   resize=resize, single_use=single_use, selective=selective)
+        return cls._make(_tl.KeyboardButtonRequestGeoLocation, text,
+                         resize, single_use, selective)
 
     @classmethod
     def request_phone(cls, text, *,
@@ -291,8 +337,8 @@ class Button:
         to the user asking whether they want to share their phone with the
         bot, and if confirmed a message with contact media will be sent.
         """
-        return cls(_tl.KeyboardButtonRequestPhone(text),
-                   resize=resize, single_use=single_use, selective=selective)
+        return cls._make(_tl.KeyboardButtonRequestPhone, text,
+                         resize, single_use, selective)
 
     @classmethod
     def request_poll(cls, text, *, force_quiz=False,
@@ -313,8 +359,8 @@ class Button:
         When the user clicks this button, a screen letting the user create a
         poll will be shown, and if they do create one, the poll will be sent.
         """
-        return cls(_tl.KeyboardButtonRequestPoll(text, quiz=force_quiz),
-                   resize=resize, single_use=single_use, selective=selective)
+        return cls._make(_tl.KeyboardButtonRequestPoll, text,
+                         resize, single_use, selective, quiz=force_quiz)
 
     @staticmethod
     def clear(selective=None):
@@ -361,7 +407,7 @@ class Button:
         `Payments API <https://core.telegram.org/api/payments>`__
         documentation for more information.
         """
-        return _tl.KeyboardButtonBuy(text)
+        return _make_buy(text)
 
     @staticmethod
     def game(text):
@@ -375,7 +421,7 @@ class Button:
         `Games <https://core.telegram.org/api/bots/games>`__
         documentation for more information on using games.
         """
-        return _tl.KeyboardButtonGame(text)
+        return _make_game(text)
 
 
 def build_reply_markup(
@@ -404,57 +450,71 @@ def build_reply_markup(
     if not buttons:
         return None
 
-    try:
-        if buttons.SUBCLASS_OF_ID == 0xe2e10ef2:
-            return buttons  # crc32(b'ReplyMarkup'):
-    except AttributeError:
-        pass
+    if getattr(buttons, 'SUBCLASS_OF_ID', None) == _REPLY_MARKUP_ID:
+        return buttons
+
+    # Fast path for the most common shape, a single row of callback buttons
+    if type(buttons) is list and len(buttons) == 1 and type(buttons[0]) is list:
+        row = buttons[0]
+        if row and all(type(b) is _tl.KeyboardButtonCallback for b in row):
+            return _tl.ReplyInlineMarkup([_tl.KeyboardButtonRow(list(row))])
 
     if not utils.is_list_like(buttons):
         buttons = [buttons]
-    if not utils.is_list_like(buttons[0]):
-        buttons = [[b] for b in buttons]
+    # A flat list of buttons means one button per row
+    flat = not utils.is_list_like(buttons[0])
 
-    is_inline = False
-    is_normal = False
+    kind = 0  # bit 1 set if inline buttons were seen, bit 2 if normal ones
     resize = None
     single_use = None
     selective = None
 
+    # Bind names used inside the loop to locals to avoid repeated lookups
+    check_inline = _is_inline_button
+    button_type = Button
+    message_button_type = MessageButton
+    valid_types = _VALID_KB_TYPES
+    make_row = _tl.KeyboardButtonRow
+
     rows = []
     for row in buttons:
-        current = []
-        for button in row:
-            if isinstance(button, Button):
-                if button.resize is not None:
-                    resize = button.resize
-                if button.single_use is not None:
-                    single_use = button.single_use
-                if button.selective is not None:
-                    selective = button.selective
-
-                button = button.button
-            elif isinstance(button, MessageButton):
-                button = button.button
-
-            inline = Button._is_inline(button)
-            is_inline |= inline
-            is_normal |= not inline
-
-            if button.SUBCLASS_OF_ID == 0xbad74a3:
-                # 0xbad74a3 == crc32(b'KeyboardButton')
-                current.append(button)
-
-        if current:
-            rows.append(_tl.KeyboardButtonRow(current))
-
-    if inline_only and is_normal:
+        current = None  # only allocated once the row has a button
+        for button in ((row,) if flat else row):
+            # Raw keyboard buttons only need the set lookup; anything else
+            # may be a (subclass of) Button or MessageButton to unwrap.
+            if type(button) not in valid_types:
+                if isinstance(button, button_type):
+                    if button.resize is not None:
+                        resize = button.resize
+                    if button.single_use is not None:
+                        single_use = button.single_use
+                    if button.selective is not None:
+                        selective = button.selective
+
+                    button = button.button
+                elif isinstance(button, message_button_type):
+                    button = button.button
+
+                if type(button) not in valid_types:
+                    raise TypeError('Cannot use {} as a keyboard button'.format(
+                        type(button).__name__))
+
+            kind |= 1 if check_inline(button) else 2
+
+            if current is None:
+                current = []
+            current.append(button)
+
+        if current is not None:
+            rows.append(make_row(current))
+
+    if inline_only and kind & 2:
         raise ValueError('You cannot use non-inline buttons here')
-    elif is_inline == is_normal and is_normal:
+    elif kind == 3:
         raise ValueError('You cannot mix inline with normal buttons')
-    elif is_inline:
+    elif kind == 1:
         return _tl.ReplyInlineMarkup(rows)
-    # elif is_normal:
+    # elif kind == 2:
     return _tl.ReplyKeyboardMarkup(
         rows, resize=resize, single_use=single_use, selective=selective)
 
@@ -0,0 +1,114 @@
+import pytest
+
+from telethon import _tl
+from telethon.types import Button, MessageButton
+from telethon.types._custom.button import build_reply_markup
+
+
+def test_build_reply_markup_unwraps_subclasses():
+    class MyButton(Button):
+        pass
+
+    class MyMessageButton(MessageButton):
+        pass
+
+    markup = build_reply_markup([
+        MyButton(_tl.KeyboardButton('a'), resize=True, single_use=None, selective=None),
+        MyMessageButton(None, _tl.KeyboardButton('b'), None, None, 1),
+    ])
+    assert isinstance(markup, _tl.ReplyKeyboardMarkup)
+    assert markup.resize is True
+    assert [row.buttons[0].text for row in markup.rows] == ['a', 'b']
+
+
+def test_build_reply_markup_rejects_non_buttons():
+    with pytest.raises(TypeError):
+        build_reply_markup([['hello']])
+
+    with pytest.raises(TypeError):
+        build_reply_markup([Button.inline('a'), object()])
+
+    with pytest.raises(TypeError):
+        build_reply_markup([[Button.text('a')], [Button.clear()]])
+
+
+def test_mention_requires_specific_user():
+    with pytest.raises(TypeError):
+        Button.mention('me')
+
+    with pytest.raises(ValueError):
+        Button.mention('me', _tl.InputPeerSelf())
+
+    with pytest.raises(ValueError):
+        Button.mention('me', _tl.InputUserSelf())
+
+
+def test_mention_input_peer_user():
+    button = Button.mention('user', _tl.InputPeerUser(123, 456))
+    assert isinstance(button, _tl.KeyboardButtonUserProfile)
+    assert button.user_id == 123
+
+    markup = build_reply_markup(button)
+    assert isinstance(markup, _tl.ReplyInlineMarkup)
+    assert markup.rows[0].buttons == [button]
+
+
+def test_text_only_buttons_are_cached():
+    assert Button.text('a').button is Button.text('a').button
+    assert Button.text('a').button is not Button.text('b').button
+    assert Button.text('a') is not Button.text('a')  # options are per wrapper
+    assert Button.buy('a') is Button.buy('a')
+    assert Button.game('a') is Button.game('a')
+    assert Button.buy('a') is not Button.game('a')
+
+
+@pytest.mark.parametrize('data', [
+    b'payload',
+    bytearray(b'payload'),
+    memoryview(b'payload'),
+])
+def test_inline_bytes_like_data_becomes_bytes(data):
+    button = Button.inline('text', data)
+    assert type(button.data) is bytes
+    assert button.data == b'payload'
+
+
+def test_inline_non_bytes_data_is_encoded():
+    assert Button.inline('text', 123).data == b'123'
+    assert Button.inline('text', 'ñ').data == 'ñ'.encode('utf-8')
+
+
+def test_inline_empty_data_uses_text():
+    assert Button.inline('text').data == b'text'
+    assert Button.inline('text', b'').data == b'text'
+    assert Button.inline('text', '').data == b'text'
+
+
+def test_inline_rejects_too_much_data():
+    Button.inline('a' * 64)
+    with pytest.raises(ValueError):
+        Button.inline('a' * 65)
+
+    # Non-ASCII text is checked by its encoded length
+    Button.inline('ñ' * 32)
+    with pytest.raises(ValueError):
+        Button.inline('ñ' * 33)
+
+    with pytest.raises(ValueError):
+        Button.inline('text', bytearray(65))
+
+
+def test_url_defaults_to_text_only_when_missing():
+    assert Button.url('https://example.com').url == 'https://example.com'
+    assert Button.url('text', 'https://example.com').url == 'https://example.com'
+    assert Button.url('text', '').url == ''
+    assert Button.auth('https://example.com').url == 'https://example.com'
+    assert Button.auth('text', '').url == ''
+
+
+def test_profile_buttons_are_inline():
+    user = _tl.InputPeerUser(123, 456)
+    for button in (Button.mention('m', user), Button.inline_mention('m', user)):
+        markup = build_reply_markup([[Button.inline('a'), button]], inline_only=True)
+        assert isinstance(markup, _tl.ReplyInlineMarkup)
+        assert markup.rows[0].buttons[1] is button